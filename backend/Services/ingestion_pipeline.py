@@ -0,0 +1,250 @@
+# backend/services/ingestion_pipeline.py
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def iter_json_array(path, read_size=1 << 16):
+    """Yield items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(read_size)
+        eof = not buffer
+        pos = 0
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip(chars):
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        skip(" \t\r\n")
+        if pos >= len(buffer):
+            return  # empty file
+        if buffer[pos:pos + 1] != "[":
+            # Not an array: a single object/document, small enough to decode at once
+            yield json.loads(buffer[pos:] + f.read())
+            return
+        pos += 1
+
+        while True:
+            skip(" \t\r\n,")
+            if pos >= len(buffer) or buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:
+                # A scalar may continue in the next block; decode again with more data
+                fill()
+                continue
+            pos = end
+            yield item
+
+def iter_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def iter_text_sections(path, max_chars=20000):
+    """Yield paragraph groups of a text file, cut at blank lines.
+
+    Sections are also cut (at a line boundary, and inside overlong lines)
+    once they reach twice max_chars, so files without blank lines stay bounded.
+    """
+    section = []
+    size = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in iter(lambda: f.readline(max_chars), ""):
+            section.append(line)
+            size += len(line)
+            if (size >= max_chars and not line.strip()) or size >= 2 * max_chars:
+                text = "".join(section).strip()
+                if text:
+                    yield text
+                section, size = [], 0
+    text = "".join(section).strip()
+    if text:
+        yield text
+
+def iter_source(path):
+    """Pick a lazy reader from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        return iter_json_array(path)
+    if extension == ".jsonl":
+        return iter_jsonl(path)
+    return iter_text_sections(path)
+
+def record_to_document(record):
+    """Turn one source record into (text, metadata)"""
+    if isinstance(record, str):
+        return record, {}
+    if not isinstance(record, dict):
+        return json.dumps(record, ensure_ascii=False), {}
+
+    if "service_name" in record:
+        # Workflow entries from Data/service_workflows.json
+        lines = [
+            f"الخدمة: {record['service_name']} ({record.get('service_name_en', '')})",
+            f"الوصف: {record.get('description', '')}",
+            "الخطوات: " + "، ".join(record.get("steps", [])),
+        ]
+        if record.get("requirements"):
+            lines.append("المتطلبات: " + "، ".join(record["requirements"]))
+        if record.get("time_estimate"):
+            lines.append(f"المدة: {record['time_estimate']}")
+        if record.get("cost"):
+            lines.append(f"التكلفة: {record['cost']}")
+        return "\n".join(lines), {
+            "service": record.get("service_name_en", record["service_name"]),
+            "title": record["service_name"],
+            "workflow_id": record.get("id"),
+        }
+
+    if "question" in record and "answer" in record:
+        return f"س: {record['question']}\nج: {record['answer']}", {
+            "title": record.get("title") or record["question"],
+            "service": record.get("service"),
+        }
+
+    text = record.get("text") or record.get("content")
+    if text:
+        return text, {"title": record.get("title"), "service": record.get("service")}
+
+    return json.dumps(record, ensure_ascii=False), {}
+
+class TokenChunker:
+    """Split text into windows of chunk_size tokens overlapping by overlap tokens"""
+
+    def __init__(self, tokenizer, chunk_size, overlap):
+        if overlap >= chunk_size:
+            raise ValueError("RAG_OVERLAP must be smaller than RAG_CHUNK_SIZE")
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.step = chunk_size - overlap
+
+    def split(self, text):
+        """Return (chunk_text, token_count) pairs cut at token boundaries"""
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoding["offset_mapping"]
+        if len(offsets) <= self.chunk_size:
+            return [(text, len(offsets))] if offsets else []
+
+        chunks = []
+        for start in range(0, len(offsets), self.step):
+            window = offsets[start:start + self.chunk_size]
+            chunks.append((text[window[0][0]:window[-1][1]], len(window)))
+            if start + self.chunk_size >= len(offsets):
+                break
+        return chunks
+
+class IngestionPipeline:
+    """Stream sources -> token chunks -> batched embeddings -> bulk vector store writes"""
+
+    def __init__(self, embeddings, vectorstore, tokenizer, chunk_size=512, overlap=50,
+                 embed_batch_size=64, workers=2, write_batch_size=512, report_every=1000):
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore
+        self.chunker = TokenChunker(tokenizer, chunk_size, overlap)
+        self.embed_batch_size = embed_batch_size
+        self.workers = workers
+        self.write_batch_size = write_batch_size
+        self.report_every = report_every
+
+    def iter_chunks(self, paths):
+        """Yield (id, text, metadata, token_count) for every chunk of every source"""
+        for path in paths:
+            source = os.path.basename(path)
+            for record_index, record in enumerate(iter_source(path)):
+                text, metadata = record_to_document(record)
+                for chunk_index, (chunk, num_tokens) in enumerate(self.chunker.split(text)):
+                    chunk_metadata = {
+                        key: value for key, value in metadata.items() if value is not None
+                    }
+                    chunk_metadata.update(source=source, record=record_index, chunk=chunk_index)
+                    # Stable IDs make re-ingesting a source an upsert, not a duplicate
+                    chunk_id = hashlib.sha1(f"{source}:{record_index}:{chunk_index}".encode()).hexdigest()
+                    yield chunk_id, chunk, chunk_metadata, num_tokens
+
+    def iter_batches(self, paths):
+        batch = []
+        for chunk in self.iter_chunks(paths):
+            batch.append(chunk)
+            if len(batch) >= self.embed_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed(self, batch):
+        return batch, self.embeddings.embed_documents([chunk[1] for chunk in batch])
+
+    def _write(self, pending):
+        self.vectorstore._collection.upsert(
+            ids=[chunk[0] for chunk, _ in pending],
+            documents=[chunk[1] for chunk, _ in pending],
+            metadatas=[chunk[2] for chunk, _ in pending],
+            embeddings=[vector for _, vector in pending],
+        )
+
+    def run(self, paths):
+        """Ingest all sources; returns throughput stats"""
+        started = time.perf_counter()
+        stats = {"chunks": 0, "tokens": 0}
+        next_report = self.report_every
+        pending = []
+
+        def collect(future):
+            nonlocal pending, next_report
+            batch, vectors = future.result()
+            pending.extend(zip(batch, vectors))
+            stats["chunks"] += len(batch)
+            stats["tokens"] += sum(chunk[3] for chunk in batch)
+            if len(pending) >= self.write_batch_size:
+                self._write(pending)
+                pending = []
+            if stats["chunks"] >= next_report:
+                elapsed = time.perf_counter() - started
+                print(f"… {stats['chunks']:,} chunks ({stats['chunks'] / elapsed:,.1f} chunks/s, "
+                      f"{stats['tokens'] / elapsed:,.0f} tokens/s)")
+                next_report += self.report_every
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Bounded in-flight batches keep memory flat on large sources
+            in_flight = deque()
+            for batch in self.iter_batches(paths):
+                in_flight.append(pool.submit(self._embed, batch))
+                if len(in_flight) >= self.workers * 2:
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+
+        if pending:
+            self._write(pending)
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = elapsed
+        stats["chunks_per_second"] = stats["chunks"] / elapsed if elapsed else 0.0
+        stats["tokens_per_second"] = stats["tokens"] / elapsed if elapsed else 0.0
+        print(f"✅ Ingested {stats['chunks']:,} chunks ({stats['tokens']:,} tokens) in {elapsed:.2f}s "
+              f"({stats['chunks_per_second']:,.1f} chunks/s)")
+        return stats
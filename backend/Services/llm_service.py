@@ -1,17 +1,34 @@
 # backend/services/llm_service.py
 import os
-from langchain.llms import HuggingFacePipeline
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+from transformers import (
+    pipeline, AutoTokenizer, AutoModelForCausalLM,
+    StoppingCriteria, StoppingCriteriaList
+)
 import torch
 
+class StopOnSequences(StoppingCriteria):
+    """Stop generation once the new text contains one of the stop strings"""
+    
+    def __init__(self, tokenizer, stop_sequences, prompt_length, lookback=16):
+        self.tokenizer = tokenizer
+        self.stop_sequences = [s for s in stop_sequences if s]
+        self.prompt_length = prompt_length
+        self.lookback = lookback
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        # Only decode the tail of the generated tokens, never the prompt
+        start = max(self.prompt_length, input_ids.shape[-1] - self.lookback)
+        tail = self.tokenizer.decode(input_ids[0, start:], skip_special_tokens=True)
+        return any(stop in tail for stop in self.stop_sequences)
+
 class LLMService:
     def __init__(self, config):
         self.config = config
         self.model = None
         self.tokenizer = None
-        self.llm = None
+        self.pipeline = None
+        self.assistant_model = None
         self.initialize_model()
     
     def initialize_model(self):
@@ -34,10 +51,6 @@ class LLMService:
                 model=self.config.HF_MODEL,
                 tokenizer=self.tokenizer,
                 device=device,
-                max_new_tokens=self.config.LLM_MAX_TOKENS,
-                temperature=self.config.LLM_TEMPERATURE,
-                top_p=0.9,
-                do_sample=True,
                 trust_remote_code=True,
                 model_kwargs={
                     "load_in_8bit": True,
@@ -45,18 +58,45 @@ class LLMService:
                 }
             )
             
-            self.llm = HuggingFacePipeline(model_pipeline=text_gen_pipeline)
+            self.pipeline = text_gen_pipeline
             print("✅ Model loaded successfully")
             
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             raise
+        
+        if self.config.HF_ASSISTANT_MODEL:
+            self.load_assistant_model()
+    
+    def load_assistant_model(self):
+        """Load the optional draft model; the main model keeps working without it"""
+        try:
+            print(f"🔄 Loading draft model {self.config.HF_ASSISTANT_MODEL}...")
+            self.assistant_model = AutoModelForCausalLM.from_pretrained(
+                self.config.HF_ASSISTANT_MODEL,
+                trust_remote_code=True,
+                use_auth_token=self.config.HF_API_KEY
+            ).to(self.pipeline.model.device)
+            print("✅ Draft model loaded, assisted decoding enabled")
+        except Exception as e:
+            print(f"⚠️ Could not load draft model, assisted decoding disabled: {e}")
+            self.assistant_model = None
     
     def generate_response(self, user_input, context="", service_type=None):
         """Generate response using the LLM"""
         
         system_prompt = self._get_system_prompt(service_type)
+        prompt = self.build_prompt(user_input, context)
         
+        try:
+            response, _ = self.generate(prompt, service_type)
+            return response
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return "معذرة، حدث خطأ. حاول مرة أخرى."
+    
+    def build_prompt(self, user_input, context=""):
+        """Format the chat prompt for the model"""
         prompt_template = PromptTemplate(
             input_variables=["context", "input"],
             template="""أنت وافي أبشر، مساعد ذكي للخدمات الحكومية السعودية.
@@ -68,14 +108,44 @@ class LLMService:
 الرد (باللغة العربية الفصحة والعامية السعودية):"""
         )
         
-        chain = LLMChain(llm=self.llm, prompt=prompt_template)
+        return prompt_template.format(context=context, input=user_input)
+    
+    def get_decoding_profile(self, service_type):
+        """Get decoding settings (token budget, sampling, stop strings) for a service"""
+        profiles = self.config.LLM_DECODING_PROFILES
+        return profiles.get(service_type, profiles["default"])
+    
+    def generate(self, prompt, service_type=None, use_assistant=True):
+        """Run generation with the service's profile; returns (text, new token count)"""
+        profile = self.get_decoding_profile(service_type)
+        stop_sequences = profile.get("stop", [])
         
-        try:
-            response = chain.run(context=context, input=user_input)
-            return response.strip()
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            return "معذرة، حدث خطأ. حاول مرة أخرى."
+        generate_kwargs = {
+            "max_new_tokens": profile["max_new_tokens"],
+            "do_sample": profile.get("do_sample", False),
+            "return_full_text": False,
+        }
+        if generate_kwargs["do_sample"]:
+            generate_kwargs["temperature"] = profile.get("temperature", self.config.LLM_TEMPERATURE)
+            generate_kwargs["top_p"] = profile.get("top_p", 0.9)
+        if stop_sequences:
+            prompt_length = len(self.tokenizer(prompt, add_special_tokens=False)["input_ids"])
+            generate_kwargs["stopping_criteria"] = StoppingCriteriaList([
+                StopOnSequences(self.tokenizer, stop_sequences, prompt_length)
+            ])
+        if use_assistant and self.assistant_model is not None:
+            generate_kwargs["assistant_model"] = self.assistant_model
+        
+        text = self.pipeline(prompt, **generate_kwargs)[0]["generated_text"]
+        
+        # The stop string itself belongs to the next turn, drop it
+        for stop in stop_sequences:
+            if stop in text:
+                text = text[:text.index(stop)]
+        text = text.strip()
+        
+        num_tokens = len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+        return text, num_tokens
     
     def _get_system_prompt(self, service_type):
         """Get service-specific system prompt"""
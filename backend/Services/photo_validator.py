@@ -0,0 +1,292 @@
+# backend/services/photo_validator.py
+import io
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import (
+    Column, DateTime, MetaData, String, Table, Text,
+    create_engine, delete, insert, select, update
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError, SQLAlchemyError
+
+# EXIF orientation -> transpose that puts the photo upright (as ImageOps.exif_transpose)
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+class ValidatorBusy(Exception):
+    """Raised when the validation queue is full"""
+
+class PhotoTooSmall(ValueError):
+    """Raised when the image is below the minimum size"""
+
+metadata = MetaData()
+
+photo_validations = Table(
+    "photo_validations", metadata,
+    Column("validation_id", String(32), primary_key=True),
+    Column("status", String(10), nullable=False),
+    Column("result", Text),
+    Column("created_at", DateTime, nullable=False, index=True),
+)
+
+class ValidationStore:
+    """Validation status and results in the shared database.
+
+    Uploads are validated by the gunicorn worker that received them, but a
+    poll can land on any worker; this lets every worker answer it.
+    """
+
+    def __init__(self, database_uri, ttl=3600, prune_every=100):
+        self.ttl = timedelta(seconds=ttl)
+        self.prune_every = prune_every
+        self._added = 0
+        self.engine = create_engine(database_uri)
+        try:
+            metadata.create_all(self.engine)
+        except (OperationalError, ProgrammingError) as e:
+            # Another worker created the table at the same time
+            if "already exists" not in str(e):
+                raise
+
+    def add(self, validation_id):
+        with self.engine.begin() as conn:
+            conn.execute(insert(photo_validations).values(
+                validation_id=validation_id, status="pending", created_at=datetime.now()
+            ))
+        self._added += 1
+        if self._added % self.prune_every == 0:
+            self.prune()
+
+    def finish(self, validation_id, result):
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(photo_validations)
+                .where(photo_validations.c.validation_id == validation_id)
+                .values(status="done", result=json.dumps(result, ensure_ascii=False))
+            )
+
+    def get(self, validation_id):
+        """(status, result) for a stored validation, or None if unknown/expired"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(photo_validations.c.status, photo_validations.c.result)
+                .where(photo_validations.c.validation_id == validation_id)
+            ).first()
+        if row is None:
+            return None
+        return row.status, json.loads(row.result) if row.result else None
+
+    def prune(self):
+        """Drop results older than ttl"""
+        with self.engine.begin() as conn:
+            conn.execute(delete(photo_validations).where(
+                photo_validations.c.created_at < datetime.now() - self.ttl
+            ))
+
+class PhotoValidator:
+    """Checks residence photos (colour, white background, sharpness) on a bounded thread pool.
+
+    Without a store, results are only known to the process that ran them, so
+    polls must reach the same gunicorn worker (single worker or sticky routing).
+    """
+
+    STAGES = ("decode", "colour", "background", "blur", "total")
+
+    def __init__(self, workers=2, max_pending=8, analysis_size=256, min_size=128, min_colourfulness=6.0,
+                 min_background_ratio=0.85, min_sharpness=60.0, history=1000, store=None):
+        self.analysis_size = analysis_size
+        self.min_size = min_size
+        self.min_colourfulness = min_colourfulness
+        self.min_background_ratio = min_background_ratio
+        self.min_sharpness = min_sharpness
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo-validator")
+        # Running + queued jobs; uploads beyond this are rejected instead of piling up
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+        self._latencies = {stage: deque(maxlen=history) for stage in self.STAGES}
+        self._latency_lock = threading.Lock()
+
+        # Recent validations by id, so clients can poll instead of waiting
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._max_jobs = history
+        self.store = store
+
+    def start(self, image_bytes):
+        """Queue validation without waiting; returns (validation_id, Future)"""
+        future = self.submit(image_bytes)
+        validation_id = uuid.uuid4().hex
+        with self._jobs_lock:
+            self._jobs[validation_id] = future
+            while len(self._jobs) > self._max_jobs:
+                self._jobs.popitem(last=False)
+        if self.store:
+            try:
+                self.store.add(validation_id)
+            except SQLAlchemyError as e:
+                # Polls to this worker still work from _jobs
+                print(f"⚠️ Could not store photo validation {validation_id}: {e}")
+            else:
+                future.add_done_callback(lambda done: self._store_result(validation_id, done))
+        return validation_id, future
+
+    def _store_result(self, validation_id, future):
+        try:
+            self.store.finish(validation_id, future.result())
+        except Exception as e:
+            print(f"⚠️ Could not store photo validation result {validation_id}: {e}")
+
+    def get_job(self, validation_id):
+        """Future for a validation started with start() in this process, or None"""
+        with self._jobs_lock:
+            return self._jobs.get(validation_id)
+
+    def status(self, validation_id):
+        """("pending", None), ("done", result), or None if unknown/expired, from any worker"""
+        future = self.get_job(validation_id)
+        if future is not None:
+            return ("done", future.result()) if future.done() else ("pending", None)
+        if self.store:
+            try:
+                return self.store.get(validation_id)
+            except SQLAlchemyError as e:
+                print(f"⚠️ Could not read photo validation {validation_id}: {e}")
+        return None
+
+    def submit(self, image_bytes):
+        """Queue validation; returns a Future or raises ValidatorBusy"""
+        if not self._slots.acquire(blocking=False):
+            raise ValidatorBusy("Photo validation queue is full")
+        try:
+            future = self._pool.submit(self.validate, image_bytes)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def decode(self, image_bytes):
+        """Decode straight to roughly analysis_size pixels and return an upright RGB array"""
+        image = Image.open(io.BytesIO(image_bytes))
+        if min(image.size) < self.min_size:
+            raise PhotoTooSmall(f"{image.size[0]}x{image.size[1]}")
+        orientation = image.getexif().get(EXIF_ORIENTATION)
+        size = (self.analysis_size, self.analysis_size)
+        # JPEG: let the decoder scale down by 1/2..1/8 instead of decoding full size
+        image.draft("RGB", size)
+        factor = min(image.size) // self.analysis_size
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        # Rotate after downscaling so the transpose is cheap
+        if orientation in ORIENTATION_TRANSPOSE:
+            image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+        pixels = np.asarray(image, dtype=np.float32)
+        if min(pixels.shape[:2]) < 3:
+            # The Laplacian needs at least 3x3 pixels
+            raise PhotoTooSmall(f"{pixels.shape[1]}x{pixels.shape[0]} after downscaling")
+        return pixels
+
+    def check_colour(self, pixels):
+        """Mean channel spread; grayscale photos are close to zero"""
+        r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        spread = np.maximum(np.maximum(np.abs(r - g), np.abs(g - b)), np.abs(r - b))
+        colourfulness = float(spread.mean())
+        return colourfulness >= self.min_colourfulness, colourfulness
+
+    def check_background(self, pixels):
+        """Share of near-white pixels along the top and upper side borders"""
+        height, width, _ = pixels.shape
+        band_h = max(1, height // 10)
+        band_w = max(1, width // 10)
+        upper = pixels[: height * 2 // 3]
+        border = np.concatenate([
+            pixels[:band_h].reshape(-1, 3),
+            upper[band_h:, :band_w].reshape(-1, 3),
+            upper[band_h:, -band_w:].reshape(-1, 3),
+        ])
+        bright = border.min(axis=1) >= 200
+        neutral = (border.max(axis=1) - border.min(axis=1)) <= 30
+        ratio = float(np.mean(bright & neutral))
+        return ratio >= self.min_background_ratio, ratio
+
+    def check_blur(self, pixels):
+        """Variance of the 4-neighbour Laplacian of the luminance"""
+        gray = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        laplacian = (
+            gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+            - 4 * gray[1:-1, 1:-1]
+        )
+        sharpness = float(laplacian.var())
+        return sharpness >= self.min_sharpness, sharpness
+
+    def validate(self, image_bytes):
+        """Run all checks; returns a JSON-serialisable result"""
+        timings = {}
+        started = time.perf_counter()
+        try:
+            pixels = self.decode(image_bytes)
+        except PhotoTooSmall as e:
+            return {"valid": False, "error": f"Photo is too small ({e})", "reason": "too_small", "checks": {}}
+        except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as e:
+            print(f"Error decoding photo: {e}")
+            return {"valid": False, "error": "Invalid image file", "reason": "invalid_image", "checks": {}}
+        timings["decode"] = time.perf_counter() - started
+
+        checks = {}
+        for name, check in (
+            ("colour", self.check_colour),
+            ("background", self.check_background),
+            ("blur", self.check_blur),
+        ):
+            stage_started = time.perf_counter()
+            passed, score = check(pixels)
+            timings[name] = time.perf_counter() - stage_started
+            checks[name] = {"passed": passed, "score": round(score, 3)}
+        timings["total"] = time.perf_counter() - started
+
+        self._record(timings)
+        return {
+            "valid": all(c["passed"] for c in checks.values()),
+            "checks": checks,
+            "size": [int(pixels.shape[1]), int(pixels.shape[0])],
+            "timings_ms": {stage: round(t * 1000, 3) for stage, t in timings.items()},
+        }
+
+    def _record(self, timings):
+        with self._latency_lock:
+            for stage, seconds in timings.items():
+                self._latencies[stage].append(seconds)
+
+    def metrics(self):
+        """Per-check latency (ms) over the recent validations"""
+        with self._latency_lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self._latencies.items()}
+        return {
+            stage: {
+                "count": int(values.size),
+                "avg_ms": round(float(values.mean()), 3),
+                "p95_ms": round(float(np.percentile(values, 95)), 3),
+                "max_ms": round(float(values.max()), 3),
+            } if values.size else {"count": 0}
+            for stage, values in samples.items()
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
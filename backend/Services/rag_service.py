@@ -2,13 +2,18 @@
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.schema import Document
+from transformers import AutoTokenizer
+from services.ingestion_pipeline import IngestionPipeline
+import argparse
 import json
+import os
 
 class RAGService:
     def __init__(self, config):
         self.config = config
         self.embeddings = None
         self.vectorstore = None
+        self.tokenizer = None
         self.initialize_rag()
     
     def initialize_rag(self):
@@ -22,6 +27,9 @@ class RAGService:
                 model_kwargs={'device': self.config.LLM_DEVICE}
             )
             
+            # Tokenizer used to chunk documents by embedding tokens
+            self.tokenizer = AutoTokenizer.from_pretrained(self.config.HF_EMBEDDING_MODEL)
+            
             # Initialize vector store
             self.vectorstore = Chroma(
                 embedding_function=self.embeddings,
@@ -34,37 +42,32 @@ class RAGService:
             print(f"❌ Error initializing RAG: {e}")
             raise
     
-    def load_service_documents(self, workflows_json_path="backend/data/service_workflows.json"):
+    def is_empty(self):
+        """True if nothing has been ingested into the vector store yet"""
+        return self.vectorstore._collection.count() == 0
+    
+    def load_service_documents(self, workflows_json_path=None):
         """Load workflow documents into vector store"""
-        try:
-            with open(workflows_json_path, 'r', encoding='utf-8') as f:
-                workflows = json.load(f)
-            
-            documents = []
-            for workflow in workflows:
-                doc_text = f"""
-                Service: {workflow['service']}
-                Title: {workflow['workflow_title']}
-                Description: {workflow['description']}
-                Steps: {json.dumps(workflow['steps'], ensure_ascii=False)}
-                """
-                
-                documents.append(Document(
-                    page_content=doc_text,
-                    metadata={
-                        "service": workflow['service'],
-                        "title": workflow['workflow_title'],
-                        "video_id": workflow.get('video_id', 'N/A')
-                    }
-                ))
-            
-            # Add documents to vector store
-            if documents:
-                self.vectorstore.add_documents(documents)
-                print(f"✅ Loaded {len(documents)} workflow documents")
+        return self.ingest([workflows_json_path or self.config.RAG_WORKFLOWS_PATH])
+    
+    def ingest(self, paths):
+        """Chunk, embed and store JSON/JSONL/text sources; returns throughput stats"""
+        pipeline = IngestionPipeline(
+            embeddings=self.embeddings,
+            vectorstore=self.vectorstore,
+            tokenizer=self.tokenizer,
+            chunk_size=self.config.RAG_CHUNK_SIZE,
+            overlap=self.config.RAG_OVERLAP,
+            embed_batch_size=self.config.RAG_EMBED_BATCH_SIZE,
+            workers=self.config.RAG_INGEST_WORKERS,
+            write_batch_size=self.config.RAG_WRITE_BATCH_SIZE
+        )
         
+        try:
+            return pipeline.run(paths)
         except Exception as e:
             print(f"❌ Error loading documents: {e}")
+            return None
     
     def retrieve_context(self, query, k=3):
         """Retrieve relevant context for a query"""
@@ -86,4 +89,20 @@ class RAGService:
         self.vectorstore.add_documents([Document(
             page_content=doc_text,
             metadata={"service": service_name, "updated": True}
-        )])
\ No newline at end of file
+        )])
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.rag_service ingest <paths...>
+    from config import config
+    
+    parser = argparse.ArgumentParser(description="RAG corpus tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subcommands.add_parser("ingest", help="chunk, embed and store JSON/JSONL/text sources")
+    ingest_parser.add_argument("paths", nargs="*", help="defaults to the service workflows file")
+    args = parser.parse_args()
+    
+    service = RAGService(config[os.getenv('ENVIRONMENT', 'development')])
+    if args.paths:
+        service.ingest(args.paths)
+    else:
+        service.load_service_documents()
@@ -0,0 +1,255 @@
+# backend/services/request_ledger.py
+import atexit
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, Text,
+    create_engine, insert, select, update
+)
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError, SQLAlchemyError
+
+metadata = MetaData()
+
+service_requests = Table(
+    "service_requests", metadata,
+    Column("request_id", String(40), primary_key=True),
+    Column("kind", String(20), nullable=False),
+    Column("service", String(50)),
+    Column("user_id", String(64), index=True),
+    Column("status", String(20), nullable=False),
+    Column("data", Text),
+    Column("created_at", DateTime, nullable=False),
+)
+
+ledger_sequences = Table(
+    "ledger_sequences", metadata,
+    Column("name", String(20), primary_key=True),
+    Column("next_value", Integer, nullable=False),
+)
+
+class RequestLedger:
+    """Issues request/invoice numbers and persists submitted requests.
+
+    IDs come from blocks reserved in the database, so they never repeat across
+    restarts or gunicorn workers and increase monotonically within a process.
+    Records are queued and written by a background thread that commits many
+    of them per transaction (group commit), so callers never wait on the disk.
+    """
+
+    PREFIXES = {
+        "request": "REQ",
+        "invoice": "INV",
+    }
+
+    def __init__(self, database_uri, batch_size=256, flush_interval=0.05, id_block=1000,
+                 max_retries=5, retry_delay=0.1):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.engine = create_engine(database_uri)
+        self._create_schema()
+        try:
+            self._retry(self._create_sequence, "Ledger sequence setup")
+        except IntegrityError:
+            pass  # Another worker or an earlier run already created it
+
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._block_end = 0
+
+        # Records queued but not yet committed, so lookups see them immediately
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+
+        self._writer = threading.Thread(target=self._write_loop, name="request-ledger", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _create_schema(self, attempts=3):
+        """create_all, tolerating another worker creating the tables at the same time"""
+        for attempt in range(1, attempts + 1):
+            try:
+                metadata.create_all(self.engine)
+                return
+            except (OperationalError, ProgrammingError) as e:
+                # Both workers saw no table, the other one won: check again
+                if "already exists" not in str(e) or attempt == attempts:
+                    raise
+
+    def _create_sequence(self):
+        with self.engine.begin() as conn:
+            conn.execute(insert(ledger_sequences).values(name="requests", next_value=1))
+
+    def _retry(self, operation, description):
+        """Run operation, retrying transient database errors with exponential backoff"""
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return operation()
+            except IntegrityError:
+                raise
+            except SQLAlchemyError as e:
+                # e.g. "database is locked" while another worker holds the write lock
+                print(f"⚠️ {description} failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+    def _reserve_block(self):
+        """Atomically claim the next range of sequence numbers"""
+        return self._retry(self._reserve_block_once, "Ledger ID block reservation")
+
+    def _reserve_block_once(self):
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(ledger_sequences)
+                .where(ledger_sequences.c.name == "requests")
+                .values(next_value=ledger_sequences.c.next_value + self.id_block)
+            )
+            end = conn.execute(
+                select(ledger_sequences.c.next_value).where(ledger_sequences.c.name == "requests")
+            ).scalar_one()
+        return end - self.id_block, end
+
+    def issue_id(self, kind="request"):
+        """Get a new collision-free request or invoice number"""
+        with self._id_lock:
+            if self._next_id >= self._block_end:
+                self._next_id, self._block_end = self._reserve_block()
+            sequence = self._next_id
+            self._next_id += 1
+        return f"{self.PREFIXES[kind]}-{datetime.now().strftime('%Y%m%d')}-{sequence:09d}"
+
+    def record(self, request_id, kind="request", service=None, user_id=None, status="submitted", data=None):
+        """Queue a request for persistence and return it without waiting for the write"""
+        entry = {
+            "request_id": request_id,
+            "kind": kind,
+            "service": service,
+            "user_id": user_id,
+            "status": status,
+            "data": json.dumps(data or {}, ensure_ascii=False),
+            "created_at": datetime.now(),
+        }
+        with self._pending_lock:
+            self._pending[request_id] = entry
+        self._queue.put(entry)
+        return entry
+
+    def submit(self, kind="request", **details):
+        """Issue an ID and record the request in one call"""
+        request_id = self.issue_id(kind)
+        self.record(request_id, kind=kind, **details)
+        return request_id
+
+    PUBLIC_FIELDS = ("request_id", "kind", "service", "status", "created_at")
+
+    @classmethod
+    def public_view(cls, record):
+        """Record without the requester's identity or form data"""
+        return {field: record[field] for field in cls.PUBLIC_FIELDS}
+
+    def get(self, request_id):
+        """Look up a request by ID (primary key index)"""
+        with self._pending_lock:
+            entry = self._pending.get(request_id)
+        if entry is None:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    select(service_requests).where(service_requests.c.request_id == request_id)
+                ).mappings().first()
+            if row is None:
+                return None
+            entry = dict(row)
+
+        result = dict(entry)
+        result["data"] = json.loads(result["data"]) if result["data"] else {}
+        result["created_at"] = result["created_at"].isoformat()
+        return result
+
+    def _write_loop(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+
+            # Collect whatever else arrives within the flush window
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        """Commit a batch, retrying with backoff; evict from _pending only once stored"""
+        def insert_batch():
+            with self.engine.begin() as conn:
+                conn.execute(insert(service_requests), batch)
+
+        try:
+            self._retry(insert_batch, f"Ledger write of {len(batch)} records")
+        except IntegrityError:
+            # Not transient: store the rows one by one and skip the duplicates
+            self._write_rows(batch)
+            return
+        except SQLAlchemyError:
+            self._give_up(batch, "retries exhausted")
+            return
+        self._evict(batch)
+
+    def _write_rows(self, batch):
+        failed = []
+        for entry in batch:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(service_requests), [entry])
+            except SQLAlchemyError as e:
+                print(f"⚠️ Ledger record {entry['request_id']} rejected: {e}")
+                failed.append(entry)
+        self._evict([entry for entry in batch if entry not in failed])
+        if failed:
+            self._give_up(failed, "rejected by the database")
+
+    def _give_up(self, batch, reason):
+        """Drop records that can't be stored, logging each one so it can be replayed"""
+        print(f"❌ LEDGER DATA LOSS: {len(batch)} records not persisted ({reason})")
+        for entry in batch:
+            print("❌ LOST LEDGER RECORD: " + json.dumps(entry, ensure_ascii=False, default=str))
+        self._evict(batch)
+
+    def _evict(self, batch):
+        with self._pending_lock:
+            for entry in batch:
+                self._pending.pop(entry["request_id"], None)
+
+    def close(self):
+        """Flush queued records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self.engine.dispose()
@@ -0,0 +1,103 @@
+# backend/services/user_directory.py
+import os
+import re
+import sqlite3
+import threading
+
+class UserDirectory:
+    """Indexed lookup of citizen profiles stored in the generate_users.py SQLite file"""
+
+    LOOKUP_FIELDS = ("national_id", "iqama_id", "phone")
+    PHONE_PATTERN = re.compile(r"^05\d{8}$")
+    ID_PATTERN = re.compile(r"^[12]\d{9,11}$")
+    # Whole digit runs only, so a prefix of an IBAN or card number never matches
+    NUMBER_PATTERN = re.compile(r"(?<!\d)\d{10,12}(?!\d)")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.ensure_indexes()
+
+    def _connection(self):
+        """One read-only connection per thread; sqlite3 connections aren't shareable"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def ensure_indexes(self):
+        """Create lookup indexes on files produced before they were added"""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"User directory not found: {self.db_path}")
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                for field in self.LOOKUP_FIELDS:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_users_{field} ON users ({field})")
+        except sqlite3.OperationalError as e:
+            # Read-only deployments ship the file already indexed
+            print(f"⚠️ Could not create user directory indexes: {e}")
+        finally:
+            conn.close()
+
+    def _fetch_one(self, field, value):
+        """Return the single matching profile; None if missing or ambiguous"""
+        rows = self._connection().execute(
+            f"SELECT * FROM users WHERE {field} = ? LIMIT 2", (value,)
+        ).fetchall()
+        if len(rows) != 1:
+            if rows:
+                print(f"⚠️ Ambiguous user directory lookup on {field}, ignoring")
+            return None
+        return dict(rows[0])
+
+    def get_by_national_id(self, national_id):
+        return self._fetch_one("national_id", national_id)
+
+    def get_by_iqama(self, iqama_id):
+        return self._fetch_one("iqama_id", iqama_id)
+
+    def get_by_phone(self, phone):
+        return self._fetch_one("phone", phone)
+
+    def lookup(self, identifier):
+        """Find a profile by phone, national ID or iqama number"""
+        if not identifier:
+            return None
+        identifier = str(identifier).strip()
+
+        if self.PHONE_PATTERN.match(identifier):
+            return self.get_by_phone(identifier)
+        if self.ID_PATTERN.match(identifier):
+            # Older directories issued iqamas starting with "1" too, so try both indexes
+            return self.get_by_national_id(identifier) or self.get_by_iqama(identifier)
+        return None
+
+    def find_in_text(self, text):
+        """Look up the first phone or ID number mentioned in free text.
+
+        Returns (number as typed, profile), or (None, None) if nothing matches.
+        """
+        for candidate in self.NUMBER_PATTERN.findall(text or ""):
+            profile = self.lookup(candidate)
+            if profile:
+                return candidate, profile
+        return None, None
+
+    @staticmethod
+    def format_address(profile, masked=False):
+        """Delivery address in the order the workflows ask for it.
+
+        masked keeps only region and city, for replies to callers whose
+        identity hasn't been verified.
+        """
+        parts = [profile.get("region"), profile.get("city")]
+        if masked:
+            parts.append("(بقية العنوان من ملفك المسجل)")
+        else:
+            parts += [profile.get("street"), profile.get("house"), profile.get("postal")]
+        return "، ".join(str(part) for part in parts if part)
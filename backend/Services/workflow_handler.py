@@ -7,32 +7,95 @@ import string
 class WorkflowHandler:
     """Handles multi-turn conversation workflows for each service"""
     
-    def __init__(self):
+    ACCEPT_WORDS = {"ايه", "اي", "ايوه", "نعم", "تمام", "اوكي", "موافق", "صح", "اكيد"}
+    # Checked before the decline words: "لا مانع" and "ما عندي مانع" mean yes
+    ACCEPT_PHRASES = ("لا مانع", "ما عندي مانع", "مافي مانع", "ما في مانع", "نفس العنوان", "يا ليت", "ياليت")
+    DECLINE_WORDS = {"لا", "لأ", "مابي", "ماابي", "بدون"}
+    DECLINE_PHRASES = ("ما ابي", "ما احتاج", "مو لازم", "ما له داعي")
+    # A reply only counts as a new address if it names a place and a street (or lists parts)
+    ADDRESS_PLACES = (
+        "الرياض", "مكة", "المدينة", "المدينه", "الشرقية", "الشرقيه", "عسير", "الحدود الشمالية",
+        "جازان", "نجران", "الباحة", "الباحه", "القصيم", "الجوف", "جدة", "جده", "الدمام",
+        "الخبر", "الطائف", "القطيف", "الأحساء", "الاحساء", "الرس", "الزلفي", "الخرج", "حي "
+    )
+    ADDRESS_MARKERS = ("شارع", "طريق", "،", ",")
+    
+    def __init__(self, user_directory=None, ledger=None):
         self.sessions = {}
         self.request_numbers = {}
+        self.user_directory = user_directory
+        self.ledger = ledger
+    
+    def submit_request(self, session, kind="request", data=None):
+        """Issue a request/invoice number and record it in the ledger"""
+        if not self.ledger:
+            return self.generate_request_id()
+        try:
+            return self.ledger.submit(
+                kind=kind,
+                service=session.get("service"),
+                user_id=session.get("user_id"),
+                data=data
+            )
+        except Exception as e:
+            # Don't fail a confirmed step because the ledger database is busy
+            print(f"⚠️ Ledger unavailable, issuing an unrecorded request ID: {e}")
+            return self.generate_request_id()
     
     def generate_request_id(self):
-        """Generate unique request ID"""
+        """Generate request ID when no ledger is configured (not persisted)"""
         return f"REQ-{datetime.now().strftime('%Y%m%d%H%M%S')}-{''.join(random.choices(string.ascii_uppercase + string.digits, k=6))}"
     
     def get_session(self, user_id):
         """Get or create user session"""
         if user_id not in self.sessions:
             self.sessions[user_id] = {
+                "user_id": user_id,
                 "service": None,
                 "step": 0,
                 "data": {},
                 "history": [],
                 "created_at": datetime.now(),
-                "request_id": None
+                "request_id": None,
+                "profile": self.lookup_profile(user_id)
             }
         return self.sessions[user_id]
     
+    def lookup_profile(self, identifier):
+        """Get citizen profile from the user directory, if one is configured"""
+        if not self.user_directory:
+            return None
+        try:
+            return self.user_directory.lookup(identifier)
+        except Exception as e:
+            print(f"Error looking up profile: {e}")
+            return None
+    
     def handle_photo_change(self, user_input, session):
         """Handle: تغيير صورة الاقامة"""
         step = session.get("step", 0)
         
         if step == 0:
+            # Future set by /api/photo/validate; validation runs off the request thread
+            pending = session.get("photo_validation")
+            if not pending:
+                return {
+                    "response": "ابشر، ارفع الصوره الجديده (ملونه، خلفيه بيضاء، واضحه) وبشيكها لك",
+                    "requires_upload": True
+                }
+            if not pending.done():
+                return {
+                    "response": "لحظات، جالس اشيك الصوره ⏳",
+                    "validation_pending": True
+                }
+            validation = pending.result()
+            if not validation.get("valid"):
+                session["photo_validation"] = None
+                return {
+                    "response": f"الصوره غير مطابقه للشروط: {self._photo_failures(validation)}. ارفع صوره ثانيه لو سمحت",
+                    "requires_upload": True,
+                    "validation": validation
+                }
             session["step"] = 1
             return {
                 "response": "وافي ابشر 🤖 بيشيك الصوره، الصوره مطابقه للشروط والاحكام، حاب انك تأكد اني اغير الصوره؟",
@@ -42,7 +105,7 @@ class WorkflowHandler:
         elif step == 1:
             if "ايه" in user_input.lower() or "تمام" in user_input.lower():
                 session["step"] = 2
-                request_id = self.generate_request_id()
+                request_id = self.submit_request(session)
                 session["request_id"] = request_id
                 return {
                     "response": f"✅ تم تغيير الصوره بنجاح بالرقم: {request_id}",
@@ -55,6 +118,37 @@ class WorkflowHandler:
                     "cancelled": True
                 }
     
+    def _address_reply(self, user_input):
+        """Classify a reply to the delivery question: accept, decline, address or None"""
+        text = " ".join(user_input.lower().split())
+        if any(phrase in text for phrase in self.ACCEPT_PHRASES):
+            return "accept"
+        if (any(place in text for place in self.ADDRESS_PLACES)
+                and any(marker in text for marker in self.ADDRESS_MARKERS)):
+            return "address"
+        words = {w.strip("؟?!.،,") for w in text.split()}
+        if words & self.DECLINE_WORDS or any(phrase in text for phrase in self.DECLINE_PHRASES):
+            return "decline"
+        if words & self.ACCEPT_WORDS:
+            return "accept"
+        return None
+    
+    def _photo_failures(self, validation):
+        """Describe failed photo checks in Arabic"""
+        if validation.get("reason") == "too_small":
+            return "الصوره صغيره، ارفع صوره بدقه اعلى"
+        if validation.get("error"):
+            return "الملف مو صوره صالحه"
+        messages = {
+            "colour": "الصوره لازم تكون ملونه",
+            "background": "الخلفيه لازم تكون بيضاء",
+            "blur": "الصوره مو واضحه"
+        }
+        return "، ".join(
+            messages[name] for name, check in validation.get("checks", {}).items()
+            if not check.get("passed")
+        )
+    
     def handle_name_change(self, user_input, session):
         """Handle: تغيير الاسم الاول"""
         step = session.get("step", 0)
@@ -71,7 +165,7 @@ class WorkflowHandler:
         elif step == 1:
             if "ايه" in user_input.lower() or "تأكد" in user_input.lower():
                 session["step"] = 2
-                request_id = self.generate_request_id()
+                request_id = self.submit_request(session, data={"new_name": session.get("new_name")})
                 session["request_id"] = request_id
                 return {
                     "response": f"✅ تمام، تم رفع طلب تغيير الاسم بنجاح بالرقم: {request_id}",
@@ -100,7 +194,7 @@ class WorkflowHandler:
         elif step == 2:
             if "ايه" in user_input.lower():
                 session["step"] = 3
-                invoice_id = self.generate_request_id()
+                invoice_id = self.submit_request(session, kind="invoice", data={"duration": session.get("duration")})
                 return {
                     "response": f"✅ تمام، اصدرت لك فاتوره برقم {invoice_id}. في حال سدادها بلغني",
                     "invoice_id": invoice_id,
@@ -109,10 +203,53 @@ class WorkflowHandler:
         elif step == 3:
             if "تمام" in user_input.lower() or "سددت" in user_input.lower():
                 session["step"] = 4
+                profile = session.get("profile")
+                if profile and self.user_directory:
+                    # The session user_id isn't authenticated: keep the full
+                    # address server-side and only show region and city
+                    session["registered_address"] = self.user_directory.format_address(profile)
+                    masked = self.user_directory.format_address(profile, masked=True)
+                    return {
+                        "response": f"🎉 يعطيك العافيه! هل حاب نوصلك اياها على عنوانك المسجل: {masked}؟ (او اكتب عنوان ثاني: المنطقه، المدينه، الشارع)",
+                        "requires_address": True,
+                        "address": masked
+                    }
                 return {
                     "response": "🎉 يعطيك العافيه! هل حاب نوصلك اياها؟ (اكتب بيانات العنوان: المنطقه، المدينه، الشارع)",
                     "requires_address": True
                 }
+        elif step == 4:
+            reply = self._address_reply(user_input)
+            if reply == "decline":
+                session["step"] = 5
+                return {
+                    "response": "تمام، تقدر تستلم الرخصه من اقرب فرع",
+                    "success": True,
+                    "delivery": False
+                }
+            if reply == "accept":
+                if not session.get("registered_address"):
+                    return {
+                        "response": "ابشر، اكتب بيانات العنوان: المنطقه، المدينه، الشارع",
+                        "requires_address": True
+                    }
+                session["address"] = session["registered_address"]
+                shown = self.user_directory.format_address(session["profile"], masked=True)
+            elif reply == "address":
+                session["address"] = user_input.strip()
+                shown = session["address"]
+            else:
+                return {
+                    "response": "ما فهمت عليك، تبي نوصلها على عنوانك المسجل؟ او اكتب العنوان: المنطقه، المدينه، الشارع",
+                    "requires_address": True
+                }
+            session["step"] = 5
+            return {
+                "response": f"✅ تمام، بنوصلك الرخصه على العنوان: {shown}",
+                "success": True,
+                "delivery": True,
+                "address": shown
+            }
     
     def handle_vehicle_sale(self, user_input, session):
         """Handle: بيع مركبة"""
@@ -121,13 +258,23 @@ class WorkflowHandler:
         if step == 0:
             # Parse vehicle info from input
             session["step"] = 1
+            typed_id, buyer = self.user_directory.find_in_text(user_input) if self.user_directory else (None, None)
+            if buyer:
+                session["buyer"] = buyer
+                session["buyer_id"] = buyer.get("national_id") or buyer.get("iqama_id")
+                # Echo only the number the caller typed; the directory name isn't theirs to see
+                return {
+                    "response": f"تمام، البيانات كلها موجوده. حاب ااكد عليها - سيتم رفع طلب بيع مركبه للمشتري صاحب الرقم {typed_id}، هل تقدر تاكد؟",
+                    "requires_confirmation": True,
+                    "buyer_id": typed_id
+                }
             return {
                 "response": "تمام، البيانات كلها موجوده. حاب ااكد عليها - سيتم رفع طلب بيع مركبه بالبيانات التالية، هل تقدر تاكد؟",
                 "requires_confirmation": True
             }
         elif step == 1:
             if "ايه" in user_input.lower():
-                request_id = self.generate_request_id()
+                request_id = self.submit_request(session, data={"buyer_id": session.get("buyer_id")})
                 session["request_id"] = request_id
                 return {
                     "response": f"✅ تم رفع طلب بيع مركبه برقم {request_id}",
@@ -147,7 +294,7 @@ class WorkflowHandler:
             }
         elif step == 1:
             if "ايه" in user_input.lower():
-                request_id = self.generate_request_id()
+                request_id = self.submit_request(session)
                 return {
                     "response": f"✅ تمام، بلغنا صاحب المركبه ورقم الطلب هو {request_id}",
                     "success": True,
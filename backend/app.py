@@ -13,6 +13,9 @@ from config import config
 from services.llm_service import LLMService, ServiceDetector
 from services.rag_service import RAGService
 from services.workflow_handler import WorkflowHandler
+from services.user_directory import UserDirectory
+from services.request_ledger import RequestLedger
+from services.photo_validator import PhotoValidator, ValidationStore, ValidatorBusy
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,11 +23,58 @@ env = os.getenv('ENVIRONMENT', 'development')
 app.config.from_object(config[env])
 CORS(app)
 
+# Initialize user directory (optional: generate with generate_users.py --format sqlite)
+try:
+    user_directory = UserDirectory(app.config['USER_DIRECTORY_PATH'])
+    print("✅ User directory loaded")
+except Exception as e:
+    print(f"⚠️ User directory unavailable: {e}")
+    user_directory = None
+
+# Initialize request ledger
+try:
+    request_ledger = RequestLedger(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        batch_size=app.config['LEDGER_BATCH_SIZE'],
+        flush_interval=app.config['LEDGER_FLUSH_INTERVAL'],
+        id_block=app.config['LEDGER_ID_BLOCK'],
+        max_retries=app.config['LEDGER_MAX_RETRIES'],
+        retry_delay=app.config['LEDGER_RETRY_DELAY']
+    )
+    print("✅ Request ledger initialized")
+except Exception as e:
+    print(f"❌ Error initializing request ledger: {e}")
+    request_ledger = None
+
+# Initialize photo validation pool; results go to the database so polls work on any worker
+try:
+    photo_results = ValidationStore(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        ttl=app.config['PHOTO_RESULT_TTL']
+    )
+except Exception as e:
+    print(f"⚠️ Photo validation results are per-worker only (poll needs sticky routing): {e}")
+    photo_results = None
+
+photo_validator = PhotoValidator(
+    workers=app.config['PHOTO_VALIDATION_WORKERS'],
+    max_pending=app.config['PHOTO_VALIDATION_QUEUE'],
+    analysis_size=app.config['PHOTO_ANALYSIS_SIZE'],
+    min_size=app.config['PHOTO_MIN_SIZE'],
+    min_colourfulness=app.config['PHOTO_MIN_COLOURFULNESS'],
+    min_background_ratio=app.config['PHOTO_MIN_BACKGROUND_RATIO'],
+    min_sharpness=app.config['PHOTO_MIN_SHARPNESS'],
+    store=photo_results
+)
+
 # Initialize services
 try:
     llm_service = LLMService(app.config)
     rag_service = RAGService(app.config)
-    workflow_handler = WorkflowHandler()
+    if rag_service.is_empty():
+        # First start: index the workflows; use `python -m services.rag_service ingest` for more sources
+        rag_service.load_service_documents()
+    workflow_handler = WorkflowHandler(user_directory=user_directory, ledger=request_ledger)
     print("✅ All services initialized successfully")
 except Exception as e:
     print(f"❌ Error initializing services: {e}")
@@ -47,7 +97,9 @@ def health():
         "services": {
             "llm": "initialized" if llm_service else "error",
             "rag": "initialized",
-            "workflow": "initialized"
+            "workflow": "initialized",
+            "user_directory": "initialized" if user_directory else "unavailable",
+            "ledger": "initialized" if request_ledger else "error"
         }
     })
 
@@ -231,6 +283,66 @@ def manage_session(user_id):
         "history_length": len(session.get("history", []))
     })
 
+@app.route('/api/requests/<request_id>', methods=['GET'])
+def get_request(request_id):
+    """Look up a submitted service request or invoice (?user_id= for full details)"""
+    if not request_ledger:
+        return jsonify({"error": "Request ledger unavailable"}), 503
+    
+    record = request_ledger.get(request_id)
+    if not record:
+        return jsonify({"error": "Request not found"}), 404
+    
+    # IDs are sequential: only the requester gets user_id and form data back
+    user_id = request.args.get('user_id')
+    if not user_id or user_id != record.get("user_id"):
+        return jsonify(request_ledger.public_view(record))
+    return jsonify(record)
+
+@app.route('/api/photo/validate', methods=['POST'])
+def validate_photo():
+    """Queue validation of an uploaded residence photo; poll the returned id for the result"""
+    upload = request.files.get('photo')
+    if not upload:
+        return jsonify({"error": "No photo uploaded"}), 400
+    
+    image_bytes = upload.read(app.config['PHOTO_MAX_BYTES'] + 1)
+    if len(image_bytes) > app.config['PHOTO_MAX_BYTES']:
+        return jsonify({"error": "Photo is too large"}), 413
+    
+    try:
+        validation_id, future = photo_validator.start(image_bytes)
+    except ValidatorBusy:
+        return jsonify({"error": "Photo validation is busy, try again shortly"}), 503
+    
+    # The photo_change workflow picks the result up from the session
+    user_id = request.form.get('user_id')
+    if user_id:
+        workflow_handler.get_session(user_id)["photo_validation"] = future
+    
+    return jsonify({
+        "validation_id": validation_id,
+        "status": "pending",
+        "status_url": f"/api/photo/validate/{validation_id}"
+    }), 202
+
+@app.route('/api/photo/validate/<validation_id>', methods=['GET'])
+def photo_validation_status(validation_id):
+    """Get the result of a queued photo validation"""
+    found = photo_validator.status(validation_id)
+    if found is None:
+        return jsonify({"error": "Validation not found"}), 404
+    status, result = found
+    if status == "pending":
+        return jsonify({"validation_id": validation_id, "status": "pending"}), 202, {"Retry-After": "1"}
+    
+    return jsonify({"validation_id": validation_id, "status": "done", **result})
+
+@app.route('/api/photo/metrics', methods=['GET'])
+def photo_metrics():
+    """Per-check photo validation latency"""
+    return jsonify(photo_validator.metrics())
+
 def handle_workflow(service_type, user_input, session):
     """Handle service-specific workflows"""
     handlers = {
@@ -250,6 +362,10 @@ def handle_workflow(service_type, user_input, session):
 def not_found(e):
     return jsonify({"error": "Not found"}), 404
 
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({"error": "Request too large"}), 413
+
 @app.errorhandler(500)
 def internal_error(e):
     return jsonify({"error": "Internal server error"}), 500
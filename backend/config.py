@@ -12,6 +12,15 @@ class Config:
     # Database
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///wafi_absher.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LEDGER_BATCH_SIZE = 256  # records per group commit
+    LEDGER_FLUSH_INTERVAL = 0.05  # seconds to wait for more records before committing
+    LEDGER_ID_BLOCK = 1000  # request numbers reserved per database round-trip
+    LEDGER_MAX_RETRIES = 5  # attempts per batch before records are logged as lost
+    LEDGER_RETRY_DELAY = 0.1  # seconds, doubled after each failed attempt
+    USER_DIRECTORY_PATH = os.getenv(
+        'USER_DIRECTORY_PATH',
+        os.path.join(os.path.dirname(__file__), 'Data', 'users.db')
+    )
     
     # HuggingFace
     HF_API_KEY = os.getenv('HUGGINGFACE_API_KEY', '')
@@ -20,13 +29,57 @@ class Config:
     
     # LLM Settings
     LLM_TEMPERATURE = 0.7
-    LLM_MAX_TOKENS = 512
+    LLM_MAX_TOKENS = 128  # budget of the 'default' decoding profile
     LLM_DEVICE = os.getenv('DEVICE', 'cpu')  # cpu, cuda
     
+    # Optional small draft model for assisted (speculative) decoding.
+    # Must share the main model's tokenizer.
+    HF_ASSISTANT_MODEL = os.getenv('HF_ASSISTANT_MODEL', '')
+    
+    # Decoding profiles per service; services not listed use 'default'
+    LLM_STOP_SEQUENCES = ["طلب المستخدم:", "السياق:", "\nuser:", "\nassistant:"]
+    LLM_DECODING_PROFILES = {
+        # Services without their own profile (plate purchase, accident report,
+        # certificate, ...) are short confirm-and-submit exchanges too
+        "default": {"max_new_tokens": LLM_MAX_TOKENS, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "photo_change": {"max_new_tokens": 96, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "name_change": {"max_new_tokens": 96, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "parking_report": {"max_new_tokens": 96, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "license_renewal": {"max_new_tokens": 160, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "vehicle_sale": {"max_new_tokens": 192, "do_sample": False, "stop": LLM_STOP_SEQUENCES},
+        "general": {
+            "max_new_tokens": 256,
+            "do_sample": True,
+            "temperature": LLM_TEMPERATURE,
+            "top_p": 0.9,
+            "stop": LLM_STOP_SEQUENCES
+        }
+    }
+    
     # RAG Settings
-    RAG_CHUNK_SIZE = 512
-    RAG_OVERLAP = 50
+    RAG_CHUNK_SIZE = 128  # tokens; the embedding model truncates input past 128
+    RAG_OVERLAP = 16
     RAG_TOP_K = 3
+    RAG_EMBED_BATCH_SIZE = 64  # chunks per embed_documents call
+    RAG_INGEST_WORKERS = 2  # embedding threads
+    RAG_WRITE_BATCH_SIZE = 512  # chunks per vector store upsert
+    RAG_WORKFLOWS_PATH = os.path.join(os.path.dirname(__file__), 'Data', 'service_workflows.json')
+    
+    # Photo validation (residence photo workflow)
+    PHOTO_MAX_BYTES = 10 * 1024 * 1024
+    # Werkzeug rejects bigger request bodies before parsing them (multipart overhead on top)
+    MAX_CONTENT_LENGTH = PHOTO_MAX_BYTES + 64 * 1024
+    PHOTO_VALIDATION_WORKERS = 2
+    PHOTO_VALIDATION_QUEUE = 8  # uploads allowed to wait for a worker
+    PHOTO_ANALYSIS_SIZE = 256  # checks run on a downscaled copy this size
+    PHOTO_MIN_SIZE = 128  # pixels, shorter side of the uploaded photo
+    PHOTO_MIN_COLOURFULNESS = 6.0
+    PHOTO_MIN_BACKGROUND_RATIO = 0.85
+    PHOTO_MIN_SHARPNESS = 60.0
+    # Results are kept in the database so a poll can hit any gunicorn worker. The chat
+    # workflow still reads the validation from the in-memory session, which (like all
+    # chat sessions) needs a single worker or sticky routing per user.
+    PHOTO_RESULT_TTL = 3600  # seconds a validation result can be polled
     
     # Session
     SESSION_TIMEOUT = 30  # minutes
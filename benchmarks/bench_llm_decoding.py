@@ -0,0 +1,58 @@
+# Benchmark per-service decoding profiles, with and without assisted decoding
+# Run: HF_ASSISTANT_MODEL=<draft model> python benchmarks/bench_llm_decoding.py --runs 3
+
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "Services"))
+
+from config import Config
+from llm_service import LLMService
+
+SAMPLE_INPUTS = {
+    "photo_change": "بغيت اغير صورة الاقامة",
+    "name_change": "تمام؟",
+    "parking_report": "فيه سيارة واقفة غلط وسادة علي الطريق",
+    "license_renewal": "ابي اجدد رخصة القيادة خمس سنين",
+    "vehicle_sale": "ابي ابيع سيارتي كامري 2020 بسعر 60 الف",
+    "general": "وش الخدمات اللي تقدمها؟",
+}
+
+def run(llm, service, prompt, runs, use_assistant):
+    lengths, latencies = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _, num_tokens = llm.generate(prompt, service, use_assistant=use_assistant)
+        latencies.append(time.perf_counter() - started)
+        lengths.append(num_tokens)
+    total_tokens = sum(lengths)
+    total_time = sum(latencies)
+    return {
+        "tokens": statistics.mean(lengths),
+        "latency": statistics.mean(latencies),
+        "tps": total_tokens / total_time if total_time else 0.0,
+    }
+
+def report(label, service, profile, stats):
+    print(f"{service:<16} {label:<9} budget={profile['max_new_tokens']:<4} "
+          f"tokens={stats['tokens']:6.1f}  latency={stats['latency']:6.2f}s  {stats['tps']:6.1f} tok/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM decoding benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--services", nargs="*", default=list(SAMPLE_INPUTS))
+    args = parser.parse_args()
+
+    service_llm = LLMService(Config)
+    service_llm.generate(service_llm.build_prompt("مرحبا"), "name_change")  # warm-up
+    for service in args.services:
+        prompt = service_llm.build_prompt(SAMPLE_INPUTS[service])
+        profile = service_llm.get_decoding_profile(service)
+        report("baseline", service, profile, run(service_llm, service, prompt, args.runs, use_assistant=False))
+        if service_llm.assistant_model is not None:
+            report("assisted", service, profile, run(service_llm, service, prompt, args.runs, use_assistant=True))
@@ -0,0 +1,80 @@
+# Benchmark indexed profile lookups in the user directory
+# Run: python benchmarks/bench_user_directory.py --count 1000000
+
+from pathlib import Path
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend" / "Services"))
+
+from generate_users import generate_users, save_users
+from user_directory import UserDirectory
+
+def build_directory(path, count, workers):
+    print(f"🚀 Building directory with {count:,} users...")
+    save_users(generate_users(count, workers=workers), path, fmt="sqlite")
+
+def sample_identifiers(path, samples, seed):
+    """Pick identifiers spread over the whole table, not just the first pages"""
+    conn = sqlite3.connect(path)
+    try:
+        max_id = conn.execute("SELECT MAX(id) FROM users").fetchone()[0]
+        rng = random.Random(seed)
+        ids = [rng.randint(1, max_id) for _ in range(samples)]
+        rows = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows += conn.execute(
+                f"SELECT phone, national_id, iqama_id FROM users WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+    finally:
+        conn.close()
+
+    rng.shuffle(rows)
+    return {
+        "phone": [r[0] for r in rows],
+        "national_id": [r[1] for r in rows if r[1]],
+        "iqama_id": [r[2] for r in rows if r[2]],
+    }
+
+def bench(label, fn, values):
+    started = time.perf_counter()
+    hits = sum(1 for v in values if fn(v))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} {len(values):>7,} lookups  {hits:>7,} hits  "
+          f"{elapsed / max(len(values), 1) * 1e6:8.1f} µs/lookup  {len(values) / elapsed:10,.0f} lookups/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="User directory lookup benchmark")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db", help="existing users.db; built in a temp dir when omitted")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "users.db")
+        if not args.db:
+            build_directory(path, args.count, args.workers)
+
+        started = time.perf_counter()
+        directory = UserDirectory(path)
+        print(f"📂 Opened directory in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        identifiers = sample_identifiers(path, args.samples, args.seed)
+        bench("phone", directory.get_by_phone, identifiers["phone"])
+        bench("national_id", directory.get_by_national_id, identifiers["national_id"])
+        bench("iqama_id", directory.get_by_iqama, identifiers["iqama_id"])
+        bench("lookup()", directory.lookup, identifiers["phone"] + identifiers["iqama_id"])
+
+if __name__ == "__main__":
+    main()
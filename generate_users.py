@@ -1,14 +1,16 @@
-# Generate 1,000 Saudi Arabian users
-# Run: python scripts/generate_users.py
+# Generate synthetic Saudi Arabian users (streaming, JSONL or SQLite)
+# Run: python generate_users.py --count 1000000 --format sqlite --workers 4
 
 from faker import Faker
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+from functools import lru_cache
+from multiprocessing import Pool
+import argparse
 import json
+import os
 import random
 import sqlite3
-
-fake = Faker('ar_SA')
-Faker.seed(42)
+import time
 
 SAUDI_REGIONS = [
     "الرياض", "مكة المكرمة", "المدينة المنورة", "الشرقية", "عسير",
@@ -20,46 +22,227 @@ SAUDI_CITIES = [
     "القطيف", "الأحساء", "الرس", "الزلفي", "الخرج"
 ]
 
+CITY_REGIONS = {
+    "الرياض": "الرياض", "الزلفي": "الرياض", "الخرج": "الرياض",
+    "جدة": "مكة المكرمة", "الطائف": "مكة المكرمة", "مكة": "مكة المكرمة",
+    "المدينة": "المدينة المنورة",
+    "الدمام": "الشرقية", "الخبر": "الشرقية", "القطيف": "الشرقية", "الأحساء": "الشرقية",
+    "الرس": "القصيم"
+}
+
 NEIGHBORHOODS = [
     "الشاطئ الغربي", "السلام", "الناصرية", "العليا", "الملك فهد",
     "الرمال", "الحمادية", "الفيحاء", "الضباط", "النرجس"
 ]
 
-def generate_phone():
-    return f"05{random.randint(10000000, 99999999)}"
+# Fixed reference so dates of birth don't drift with the day the script runs
+REFERENCE_DATE = date(2024, 1, 1)
+
+DEFAULT_OUTPUT_DIR = os.path.join("backend", "Data")
+DEFAULT_SHARD_SIZE = 10000
+DEFAULT_BATCH_SIZE = 5000
+
+USER_FIELDS = [
+    "id", "name_ar", "phone", "national_id", "iqama_id", "id_type",
+    "dob", "region", "city", "street", "house", "postal"
+]
+
+# Lookup columns indexed by the user directory (backend/Services/user_directory.py)
+INDEXED_FIELDS = ["national_id", "iqama_id", "phone"]
+
+PHONE_SPACE = 10 ** 8
+ID_SPACE = 10 ** 11
+# Odd and not a multiple of 5, so multiplying by it permutes any 10**k space
+SCRAMBLE_MULTIPLIER = 2654435761
+
+@lru_cache(maxsize=None)
+def scramble_offset(seed, salt, space):
+    return random.Random(f"{seed}:{salt}").randrange(space)
 
-def generate_iqama():
-    return f"{random.choice([1, 2])}{random.randint(10000000000, 99999999999)}"
+def scramble(index, space, seed, salt):
+    """Map index to a unique, random-looking number below space (for index < space)"""
+    return (index * SCRAMBLE_MULTIPLIER + scramble_offset(seed, salt, space)) % space
 
-def generate_national_id():
-    return f"1{random.randint(10000000000, 99999999999)}"
+def generate_phone(index, seed):
+    return f"05{scramble(index, PHONE_SPACE, seed, 'phone'):08d}"
+
+def generate_iqama(index, seed):
+    return f"2{scramble(index, ID_SPACE, seed, 'id'):011d}"
+
+def generate_national_id(index, seed):
+    return f"1{scramble(index, ID_SPACE, seed, 'id'):011d}"
+
+def generate_dob(rng, minimum_age=18, maximum_age=80):
+    age_days = rng.randint(minimum_age * 365, maximum_age * 365)
+    return (REFERENCE_DATE - timedelta(days=age_days)).isoformat()
+
+_fake = None
+
+def get_faker():
+    """One Faker per process; building the ar_SA provider set is slow"""
+    global _fake
+    if _fake is None:
+        _fake = Faker('ar_SA')
+    return _fake
+
+def shard_seed(seed, shard):
+    """Deterministic seed for one shard, independent of worker scheduling"""
+    return f"{seed}:{shard}"
+
+def generate_shard(args):
+    """Generate users [start, stop) with their own RNG and Faker instance"""
+    seed, shard, start, stop = args
+    rng = random.Random(shard_seed(seed, shard))
+    fake = get_faker()
+    fake.seed_instance(shard_seed(seed, shard))
 
-def generate_users(count=1000):
     users = []
-    for i in range(count):
-        is_iqama = random.choice([True, False])
+    for i in range(start, stop):
+        is_iqama = rng.choice([True, False])
         user = {
             "id": i + 1,
             "name_ar": fake.name(),
-            "phone": generate_phone(),
-            "national_id": generate_national_id() if not is_iqama else None,
-            "iqama_id": generate_iqama() if is_iqama else None,
+            "phone": generate_phone(i, seed),
+            "national_id": generate_national_id(i, seed) if not is_iqama else None,
+            "iqama_id": generate_iqama(i, seed) if is_iqama else None,
             "id_type": "Iqama" if is_iqama else "National ID",
-            "dob": fake.date_of_birth(minimum_age=18, maximum_age=80).isoformat(),
-            "city": random.choice(SAUDI_CITIES),
-            "street": f"شارع {random.randint(1, 50)}",
-            "house": random.randint(1, 999),
-            "postal": f"{random.randint(10000, 99999)}"
+            "dob": generate_dob(rng),
+            "city": rng.choice(SAUDI_CITIES),
+            "street": f"شارع {rng.randint(1, 50)}",
+            "house": rng.randint(1, 999),
+            "postal": f"{rng.randint(10000, 99999)}"
         }
+        user["region"] = CITY_REGIONS[user["city"]]
         users.append(user)
     return users
 
-def save_json(users, filename='backend/data/users.json'):
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
-    print(f"✅ Saved {len(users)} users to {filename}")
+def iter_shards(count, seed, shard_size):
+    for shard, start in enumerate(range(0, count, shard_size)):
+        yield (seed, shard, start, min(start + shard_size, count))
+
+def generate_users(count=1000, seed=42, workers=1, shard_size=DEFAULT_SHARD_SIZE):
+    """Yield users in id order; output is identical for any number of workers"""
+    if count > PHONE_SPACE:
+        raise ValueError(f"Can't generate more than {PHONE_SPACE:,} users with unique phones")
+    shards = iter_shards(count, seed, shard_size)
+    if workers <= 1:
+        for task in shards:
+            yield from generate_shard(task)
+        return
+
+    with Pool(processes=workers) as pool:
+        # imap keeps shard order and only keeps a few shards in flight
+        for users in pool.imap(generate_shard, shards):
+            yield from users
+
+class JSONLWriter:
+    """Append users as one JSON object per line"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'w', encoding='utf-8')
+
+    def write_batch(self, users):
+        self.file.write("".join(json.dumps(u, ensure_ascii=False) + "\n" for u in users))
+
+    def close(self):
+        self.file.close()
+
+class SQLiteWriter:
+    """Insert users with executemany, one transaction per batch"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            os.remove(filename)
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("""
+            CREATE TABLE users (
+                id INTEGER PRIMARY KEY,
+                name_ar TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                national_id TEXT,
+                iqama_id TEXT,
+                id_type TEXT NOT NULL,
+                dob TEXT,
+                region TEXT,
+                city TEXT,
+                street TEXT,
+                house INTEGER,
+                postal TEXT
+            )
+        """)
+        placeholders = ", ".join("?" for _ in USER_FIELDS)
+        self.insert_sql = f"INSERT INTO users ({', '.join(USER_FIELDS)}) VALUES ({placeholders})"
+
+    def write_batch(self, users):
+        with self.conn:
+            self.conn.executemany(
+                self.insert_sql,
+                ([u[field] for field in USER_FIELDS] for u in users)
+            )
+
+    def close(self):
+        # Building indexes once after the bulk load is much faster than
+        # maintaining them on every insert
+        with self.conn:
+            for field in INDEXED_FIELDS:
+                self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_users_{field} ON users ({field})")
+        self.conn.close()
+
+WRITERS = {
+    "jsonl": JSONLWriter,
+    "sqlite": SQLiteWriter,
+}
+
+def save_users(users, filename, fmt="jsonl", batch_size=DEFAULT_BATCH_SIZE, report_every=100000):
+    """Stream users to disk in batches and report throughput"""
+    writer = WRITERS[fmt](filename)
+    started = time.perf_counter()
+    written = 0
+    next_report = report_every
+    batch = []
+
+    try:
+        for user in users:
+            batch.append(user)
+            if len(batch) >= batch_size:
+                writer.write_batch(batch)
+                written += len(batch)
+                batch = []
+                if written >= next_report:
+                    elapsed = time.perf_counter() - started
+                    print(f"… {written:,} users ({written / elapsed:,.0f} rows/s)")
+                    next_report += report_every
+        if batch:
+            writer.write_batch(batch)
+            written += len(batch)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = written / elapsed if elapsed else 0.0
+    print(f"✅ Saved {written:,} users to {filename} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return written
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic Saudi users")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    parser.add_argument("--output", help="defaults to backend/Data/users.<format>")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    print("🚀 Generating 1,000 users...")
-    users = generate_users(1000)
-    save_json(users)
\ No newline at end of file
+    args = parse_args()
+    extension = "db" if args.format == "sqlite" else "jsonl"
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"users.{extension}")
+
+    print(f"🚀 Generating {args.count:,} users (seed={args.seed}, workers={args.workers})...")
+    users = generate_users(args.count, seed=args.seed, workers=args.workers, shard_size=args.shard_size)
+    save_users(users, output, fmt=args.format, batch_size=args.batch_size)